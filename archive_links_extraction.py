@@ -1,10 +1,14 @@
 """
 João Loss - joao.loss@edu.ufes.br
 
-This file contains a script that traverses the Wayback Machine archive page (https://help.archive.org/help/using-the-wayback-machine/)
-to scrape links from UOL within a specified date range. The results are stored in OUTPUT_CSV_PATH. The logs are saved in LOG_PATH.
-
-Note: Selenium was used instead of BeautifulSoup because some essential elements for scraping are loaded via JS after the initial received page.
+This file contains a script that queries the Wayback Machine CDX API (https://github.com/internetarchive/wayback/tree/master/wayback-cdx-server)
+to collect links from UOL within a specified date range. The results are stored in OUTPUT_CSV_PATH. The logs are saved in LOG_PATH.
+
+Note: the CDX API returns in a single request per year the same captures listed by the Wayback Machine archive page
+(https://help.archive.org/help/using-the-wayback-machine/), so no browser is needed.
+Note: the legacy workflow, which traverses the archive page with Selenium, is still available with --use-selenium. Selenium was used
+instead of BeautifulSoup because some essential elements for scraping are loaded via JS after the initial received page. Each year is
+scraped by a separate process with its own Chrome instance (at most MAX_WORKERS at the same time).
 """
 
 from selenium import webdriver
@@ -12,14 +16,22 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.common.exceptions import StaleElementReferenceException
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
 from argparse import ArgumentParser, ArgumentTypeError
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from collections.abc import Iterator
+import multiprocessing
 import time
-import pandas as pd
+import csv
 import os
 from json import dumps
 import logging
+import logging.handlers
 import sys
 
 os.makedirs(name="out", exist_ok=True)
@@ -29,11 +41,19 @@ os.makedirs("logs", exist_ok=True)
 LOG_PATH = os.path.join("logs", f"{os.path.basename(__file__).split(".")[0]}.log")
 
 SITE = "www.uol.com.br"
+CDX_API_LINK = "https://web.archive.org/cdx/search/cdx"
+MEMENTO_LINK = "https://web.archive.org/web/{timestamp}id_/{original}" # "id_": the archived page as it was, without web archive rewriting
+REQUEST_TIMEOUT = 60
 WEB_ARCHIVE_LINK = "https://web.archive.org/web/{year}0101*/" + SITE
 STR_TO_INT = {"JAN": 1, "FEB": 2, "MAR": 3,
               "APR": 4, "MAY": 5, "JUN": 6, 
               "JUL": 7, "AUG": 8, "SEP": 9, 
               "OCT": 10, "NOV": 11, "DEC": 12}
+MAX_WORKERS = 4 # each worker runs its own Chrome instance
+MONTH_DATA_SCRIPT = """
+return [arguments[0].querySelector('.month-title').innerText,
+        Array.from(arguments[0].querySelectorAll('.calendar-day')).map(d => d.querySelector('a')?.href ?? null)];
+"""
 
 def get_args():
     """
@@ -42,9 +62,16 @@ def get_args():
 
     parser = ArgumentParser()
     
+    parser.add_argument(
+        "--use-selenium",
+        help="If enabled, the links are scraped from the archive page with Selenium instead of queried from the CDX API (legacy workflow).",
+        action="store_true",
+        default=False
+    )
+
     parser.add_argument(
         "--headless",
-        help="If enabled, the program will run without a graphical user interface (headless mode).",
+        help="If enabled, the program will run without a graphical user interface (headless mode). Only used with --use-selenium.",
         action="store_true",
         default=False
     )
@@ -80,9 +107,75 @@ def get_args():
 
     return parser.parse_args()
 
-def get_archive_links(start_date: datetime, end_date: datetime, options: Options) -> list[dict]:
+def get_year_archive_links(year: int, start_date: datetime, end_date: datetime, session: requests.Session) -> Iterator[dict]:
+    """
+    Fetch archive page links for each month of the given year between start_date and end_date (inclusive)
+    with a single CDX API request. Only the first successful capture of each day is kept, as in the archive page calendar.
+
+    Yields a dict per month, each containing:
+        - "year": int
+        - "month": int
+        - "links": list of URLs (strings) for that month's days
+    """
+
+    date_checker = lambda d: (d >= start_date) and (d <= end_date)
+    url_checker = lambda u: ("https://" in u) and ("www.uol.com.br" in u)
+
+    logging.info(f"==> Curr. year: {year}")
+
+    params = {
+        "url": SITE,
+        "from": f"{year}0101",
+        "to": f"{year}1231",
+        "output": "json",
+        "collapse": "timestamp:8", # one capture per day (yyyymmdd)
+        "filter": "statuscode:200"
+    }
+    try:
+        response = session.get(CDX_API_LINK, params=params, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        rows = response.json()
+    except (RequestException, ValueError) as e:
+        logging.error(f"Failed to get the captures of {year} from the CDX API, skipping... ({e})")
+        return
+
+    # Each row is [urlkey, timestamp, original, mimetype, statuscode, digest, length]; the first one is the header
+    href_lists = {month_num: list() for month_num in range(1, 13)}
+    for _, timestamp, original, *_ in rows[1:]:
+        href = MEMENTO_LINK.format(timestamp=timestamp, original=original)
+        if url_checker(href):
+            href_lists[int(timestamp[4:6])].append(href)
+
+    for month_num, href_list in href_lists.items():
+        # Only proceed if this month is within the desired date range
+        if date_checker(datetime(year=year, month=month_num, day=1)):
+            logging.info(f"{len(href_list)} links found for {month_num}/{year}.")
+            yield {
+                "year": year,
+                "month": month_num,
+                "links": dumps(href_list) # from list to str
+            }
+
+    logging.info("")
+
+def get_archive_links(start_date: datetime, end_date: datetime) -> Iterator[dict]:
+    """
+    Fetch archive page links for each month between start_date and end_date (inclusive) from the CDX API.
+
+    Yields the dicts described in get_year_archive_links(), sorted by year and month.
     """
-    Fetch archive page links for each month between start_date and end_date (inclusive).
+
+    retry = Retry(total=3, backoff_factor=5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+    with requests.Session() as session:
+        session.mount("https://", HTTPAdapter(max_retries=retry))
+
+        for year in range(start_date.year, end_date.year + 1):
+            yield from get_year_archive_links(year, start_date, end_date, session)
+
+def get_year_archive_links_selenium(year: int, start_date: datetime, end_date: datetime, options: Options) -> list[dict]:
+    """
+    Fetch archive page links for each month of the given year between start_date and end_date (inclusive).
+    It runs in a worker process with its own Chrome instance.
 
     Returns a list of dicts, each containing:
         - "year": int
@@ -93,67 +186,76 @@ def get_archive_links(start_date: datetime, end_date: datetime, options: Options
     driver = webdriver.Chrome(options=options)
     wait = WebDriverWait(driver, 10)
 
-    current_year = start_date.year
     links = list()
 
     date_checker = lambda d: (d >= start_date) and (d <= end_date)
     url_checker = lambda u: ("https://" in u) and ("www.uol.com.br" in u)
 
-    while current_year <= end_date.year:
-        logging.info(f"==> Curr. year: {current_year}")
+    logging.info(f"==> Curr. year: {year}")
+
+    url = WEB_ARCHIVE_LINK.format(year=year)
+    driver.get(url)
 
-        url = WEB_ARCHIVE_LINK.format(year=current_year)
-        driver.get(url)
+    all_months = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "month")))
+    # Instead of a fixed sleep per month, wait until the calendar has rendered its first day links
+    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".calendar-day a")))
 
-        all_months = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, "month")))
+    for month in all_months:
+        # Scroll so this month element becomes visible, in case the calendar renders its days lazily
+        driver.execute_script("arguments[0].scrollIntoView();", month)
 
-        for i, month in enumerate(all_months):
-            
+        # Attempt retrieving links for that month
+        for _ in range(5):
             try:
-                # Scroll so this month element becomes visible
-                x = month.location["x"]
-                y = month.location["y"]
-                driver.execute_script(f"window.scrollTo({x}, {y});")
+                # Get the month title and the href of each day link with a single call to the browser
+                # (instead of one find_element/get_attribute round-trip per day)
+                month_title, day_href_list = driver.execute_script(MONTH_DATA_SCRIPT, month)
+                if None in day_href_list:
+                    # Some days don't have their link yet: retry instead of saving the month with missing links
+                    raise ValueError(f"{day_href_list.count(None)}/{len(day_href_list)} days without link")
+
+                # Get the month number (from its title text)
+                month_num = STR_TO_INT[month_title.strip().upper()] # without stylesheets the title isn't uppercased
+                date = datetime(year=year, month=month_num, day=1)
+
+                # Only proceed if this month is within the desired date range
+                if date_checker(date):
+                    href_list = [href.strip() for href in day_href_list if url_checker(href.strip())]
+                    
+                    links.append({
+                        "year": year,
+                        "month": month_num,
+                        "links": dumps(href_list) # from list to str
+                    })
+                    logging.info(f"{len(href_list)} links found for {month_num}/{year}.")
+
+                break  # break out of retry loop if success
+            except Exception as e:
+                logging.error(f"Failed to get links for month element {month}.")
                 time.sleep(1)
-            except StaleElementReferenceException:
-                logging.error(f"Failed while processing month {i+1}.")
-                continue
-
-            # Attempt retrieving links for that month
-            for _ in range(5):
-                try:
-                    # Get the month number (from its title text)
-                    month_num = STR_TO_INT[month.find_element(By.CLASS_NAME, "month-title").text]
-                    date = datetime(year=current_year, month=month_num, day=1)
-
-                    # Only proceed if this month is within the desired date range
-                    if date_checker(date):
-                        calendar_day_list = month.find_elements(By.CLASS_NAME, "calendar-day")
-                        href_list = list()
-                        for calendar_day in calendar_day_list:
-                            # Extract href attribute from each day link
-                            href = calendar_day.find_element(By.TAG_NAME, "a").get_attribute("href").strip()
-                            if url_checker(href):
-                                href_list.append(href)
-                        
-                        links.append({
-                            "year": current_year,
-                            "month": month_num,
-                            "links": dumps(href_list) # from list to str
-                        })
-                        logging.info(f"{len(href_list)} links found for {month_num}/{current_year}.")
-
-                    break  # break out of retry loop if success
-                except Exception as e:
-                    logging.error(f"Failed to get links for month element {month}.")
-                    time.sleep(1)
-
-        current_year += 1  # move to next year
-        logging.info("")
+
+    logging.info("")
 
     driver.quit()
     return links
 
+def get_archive_links_selenium(start_date: datetime, end_date: datetime, options: Options, log_queue: multiprocessing.Queue) -> Iterator[dict]:
+    """
+    Fetch archive page links for each month between start_date and end_date (inclusive) from the archive page, scraping
+    the years in parallel.
+
+    Yields the dicts described in get_year_archive_links_selenium(), sorted by year (each year as soon as it's done).
+    """
+
+    years = range(start_date.year, end_date.year + 1)
+
+    with ProcessPoolExecutor(max_workers=min(MAX_WORKERS, len(years)),
+                             initializer=worker_logger_config,
+                             initargs=(log_queue,)) as executor:
+        # map() returns the results in the same order as years
+        for year_links in executor.map(get_year_archive_links_selenium, years, repeat(start_date), repeat(end_date), repeat(options)):
+            yield from year_links
+
 def config_root_logger(quite_mode:bool):
     root = logging.getLogger()
     root.setLevel(logging.DEBUG) # let handlers check log levels
@@ -172,28 +274,60 @@ def config_root_logger(quite_mode:bool):
         stdout_handler.setFormatter(formatter)
         root.addHandler(stdout_handler)
 
+def worker_logger_config(queue: multiprocessing.Queue):
+    """
+    Send the worker process logs to the main process, where a listener writes them with the root logger handlers.
+    """
+    root = logging.getLogger()
+    root.handlers.clear() # handlers inherited from the main process (fork) would write to the same file concurrently
+    root.setLevel(logging.DEBUG) # don't filter here — the listener is responsible for deciding which logs to output
+    root.addHandler(logging.handlers.QueueHandler(queue))
+
 def main():
     args = get_args()
     config_root_logger(args.quiet)
 
-    options = Options()
-    options.add_argument("--no-sandbox") # turn off security mode to avoid some issues
-    options.add_argument("--log-level=3") # set to log only error messages
-    options.add_argument("--start-maximized")
-    if args.headless:
-        options.add_argument("--headless") # no GUI
-    
-    options.page_load_strategy = "eager" # wait until the initial HTML document is loaded and parsed
+    if args.use_selenium:
+        options = Options()
+        options.add_argument("--no-sandbox") # turn off security mode to avoid some issues
+        options.add_argument("--log-level=3") # set to log only error messages
+        options.add_argument("--start-maximized")
+        if args.headless:
+            options.add_argument("--headless") # no GUI
+        
+        # Images, stylesheets and fonts aren't needed to read the calendar elements
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2,
+                                                  "profile.managed_default_content_settings.stylesheets": 2,
+                                                  "profile.managed_default_content_settings.fonts": 2})
+
+        options.page_load_strategy = "none" # don't wait for the page load, get_year_archive_links_selenium() waits for the month elements
+
+        log_queue = multiprocessing.Queue()
+        logs_listener = logging.handlers.QueueListener(log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+        logs_listener.start()
+
+        links = get_archive_links_selenium(start_date=args.start_date,
+                                           end_date=args.end_date,
+                                           options=options,
+                                           log_queue=log_queue)
+    else:
+        links = get_archive_links(start_date=args.start_date,
+                                  end_date=args.end_date)
 
     start_time = time.time()
-    links = get_archive_links(start_date=args.start_date,
-                              end_date=args.end_date,
-                              options=options)
+    # Each month is written as soon as it's available (links is a generator), so the progress is kept if the script is interrupted
+    with open(OUTPUT_CSV_PATH, mode="w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n") # same format as pandas.DataFrame.to_csv
+        writer.writerow(["year", "month", "links"])
+        for row in links:
+            writer.writerow([row["year"], row["month"], row["links"]])
+            f.flush()
     end_time = time.time()
+
+    if args.use_selenium:
+        logs_listener.stop()
     logging.info(f"Total time taken to complete: {(end_time - start_time)/60:.02f}min")  
-    
-    df = pd.DataFrame(data=links)
-    df.to_csv(path_or_buf=OUTPUT_CSV_PATH, index=False)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,16 +4,24 @@ João Loss - joao.loss@edu.ufes.br
 This script processes UOL archive links collected by archive_links_extraction.py and saved in ARCHIVE_CSV_PATH
 to extract UOL web news links, which are then saved in OUTPUT_FILES_PATH. The logs are saved in LOG_PATH.
 
-Note: multithreading or multiprocessing could be used to speed up, but web archive rates limit requests per minute, that's
-why only the main thread were used.
+Note: web archive rates limit requests per minute, that's why the archive pages of each month are downloaded by only a
+few threads (MAX_NUM_WORKERS). Parsing and writing are still done by the main thread, while the next month is downloaded.
 """
 
-from bs4 import BeautifulSoup
 import requests
-from requests.exceptions import ConnectionError, ReadTimeout, RequestException
+import requests_cache
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from html import unescape
+from urllib.parse import urljoin
+from collections import defaultdict
+from collections.abc import Iterator
 import os
-import json
+import re
+import orjson
 import time
 import logging
 import sys
@@ -25,38 +33,72 @@ LOG_PATH = os.path.join("logs", f"{os.path.basename(__file__).split(".")[0]}.log
 ARCHIVE_CSV_PATH = os.path.join("out", "archive_links.csv")
 OUTPUT_FILES_PATH = os.path.join("out", "uol_links")
 os.makedirs(OUTPUT_FILES_PATH, exist_ok=True)
+CACHE_PATH = os.path.join("out", ".wayback_cache") # archived pages never change, so they're cached forever
 
 REQUEST_TIMEOUT = 25
-RETRY_TIME = 30 # to avoid reaching web archive requests per minute rates
+RETRY_BACKOFF = 0.5 # exponential backoff factor between retries; on 429 web archive's Retry-After is respected instead
+MIN_PAGE_SIZE = 4096 # in bytes, smaller responses are web archive notices, not archived home pages
+MAX_NUM_WORKERS = 5 # keep it low, web archive rates limit requests per minute
+MEMENTO_TIMESTAMP_PATTERN = re.compile(r"/web/(\d+)/") # timestamp without modifier, i.e. the rewritten archived page
+ANCHOR_HREF_PATTERN = re.compile(rb"""<a\s(?:(?:[^>"']|"[^"]*"|'[^']*')*?\s)?href\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE) # double, single or no quotes
 
-def save_uol_news_links(archive_links:list[str], year:int):
-    def get_response(link:str) -> requests.Response | None:
-        """
-        Return the response or None in failure.
-        """
-        for n_try in range(3):
-            try:
-                response = requests.get(link, timeout=REQUEST_TIMEOUT)
-                break
-            except ConnectionError:
-                logging.warning(f"ConnectionError for {link} (attempt {n_try+1})")
-                time.sleep(RETRY_TIME)
-            except ReadTimeout:
-                logging.warning(f"ReadTimeout for {link} (attempt {n_try+1})")
-                time.sleep(RETRY_TIME)
-            except RequestException as e:
-                logging.warning(f"RequestException for {link} (attempt {n_try+1}): {e}\n")
-                time.sleep(RETRY_TIME)
-        else:
-            logging.error(f"Failed to connect with {link} after {n_try+1} attempts, skipping...")
-            return None
-
-        if response.status_code != 200:
-            logging.error(f"Response status code != 200 for {link} (got {response.status_code}), skipping...")
-            return None
-        
-        return response
+def build_session() -> requests.Session:
+    """
+    Return a session that keeps the connections to web archive alive, retries failed requests and caches the responses on disk.
+    """
+    retry = Retry(total=3, connect=3, read=3,
+                  backoff_factor=RETRY_BACKOFF,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET",),
+                  respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_NUM_WORKERS, max_retries=retry) # one host, one connection per worker
+
+    # The filesystem backend (one file per response) avoids write contention between the worker threads
+    session = requests_cache.CachedSession(CACHE_PATH,
+                                           backend="filesystem",
+                                           expire_after=requests_cache.NEVER_EXPIRE,
+                                           allowable_methods=("GET",),
+                                           allowable_codes=(200, 404))
+    session.headers["Accept-Encoding"] = "gzip, deflate, br" # br responses are decoded by urllib3 through the brotli package
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+SESSION = build_session() # shared by the worker threads
+
+ensured_dirs = set() # folders already created in this run, to avoid a makedirs call per archive link
 
+def ensure_dir(path:str):
+    """
+    Create the folder if it wasn't already created in this run.
+    """
+    if path not in ensured_dirs:
+        os.makedirs(path, exist_ok=True)
+        ensured_dirs.add(path)
+
+def get_response(link:str) -> requests.Response | None:
+    """
+    Return the response or None in failure.
+    """
+    # The "id_" modifier makes web archive return the archived page as it was (no toolbar and no rewritten links)
+    identity_link = MEMENTO_TIMESTAMP_PATTERN.sub(r"/web/\1id_/", link, count=1)
+    try:
+        response = SESSION.get(identity_link, timeout=REQUEST_TIMEOUT) # retries are handled by the session adapter
+    except RequestException as e:
+        logging.error(f"Failed to connect with {link}, skipping... ({e})")
+        return None
+
+    if response.status_code != 200:
+        logging.error(f"Response status code != 200 for {link} (got {response.status_code}), skipping...")
+        return None
+    
+    return response
+
+def save_uol_news_links(archive_links:list[str], year:int, responses:Iterator[requests.Response | None]):
+    """
+    Extract the UOL news links from the archive pages of a month and save them. 'responses' yields the response of each
+    archive link (see get_response()), in the same order as 'archive_links'.
+    """
     def get_real_url_date(url:str) -> tuple[int,int]:
         """
         Return the actual year and month from the URL, as it may differ from those in the original archive URL.
@@ -65,47 +107,73 @@ def save_uol_news_links(archive_links:list[str], year:int):
         y = int(date[:4])
         m = int(date[4:6])
         return y, m
+
+    def get_original_url(url:str) -> str:
+        """
+        Return the archived page URL from the web archive URL, e.g. https://web.archive.org/web/20100104095858id_/http://www.uol.com.br/
+        -> http://www.uol.com.br/
+        """
+        return url.split("/web/")[1].split("/", 1)[1]
     
     href_filter = lambda u: "http" + u.split("http")[-1] # clarification comment at the end
 
     # Create the corresponding folder
     year_folder_path = os.path.join(OUTPUT_FILES_PATH, str(year))
-    os.makedirs(year_folder_path, exist_ok=True)
+    ensure_dir(year_folder_path)
 
     loss_count = 0
     total_archive_links = len(archive_links)
     links_found_count = 0
-    for i, link in enumerate(archive_links):
-        response = get_response(link)
+    opened_files = dict() # file path -> file object, each output file is opened only once
+    seen_by_month = defaultdict(set) # (year, month) -> links already written, the same news is usually in several snapshots
 
+    for i, (link, response) in enumerate(zip(archive_links, responses)):
         if not response:
             loss_count += 1
             continue
 
-        html = response.text
-        actual_year, actual_month = get_real_url_date(response.url)
-        soup = BeautifulSoup(html, 'html.parser')
-        anchor_elements = soup.find_all("a")
+        if len(response.content) < MIN_PAGE_SIZE:
+            logging.error(f"Response too small for {link} ({len(response.content)} bytes), skipping...")
+            loss_count += 1
+            continue
+
+        actual_year, actual_month = get_real_url_date(response.url) # also valid for "id_" URLs: the date comes first
+
+        # A fast bytes search before the regex scan: without "/{year}/" the page can't have any news link
+        if f"/{actual_year}/".encode() not in response.content:
+            logging.info(f"[{i+1}] 0 links found in {link}")
+            continue
 
+        original_url = get_original_url(response.url)
+        encoding = response.encoding or "utf-8"
+
+        # The raw bytes are scanned directly, there is no need for a parser to read the anchors' href
         uol_links = set()
-        for e in anchor_elements:
-            href = e.get("href")
-            if href is not None:
-                href = str(href)
-                if f"/{actual_year}/" in href:
-                    uol_links.add(href_filter(href))
+        for match in ANCHOR_HREF_PATTERN.finditer(response.content):
+            href = unescape(match.group(match.lastindex).decode(encoding, errors="replace")) # e.g. &amp; -> &
+            href = urljoin(original_url, href) # the page isn't rewritten, so relative links must be resolved
+            if f"/{actual_year}/" in href:
+                uol_links.add(href_filter(href))
         
-        logging.info(f"[{i+1}] {len(uol_links)} links found in {link}")
+        new_uol_links = uol_links - seen_by_month[(actual_year, actual_month)]
+        seen_by_month[(actual_year, actual_month)] |= new_uol_links
+        logging.info(f"[{i+1}] {len(uol_links)} links found in {link} ({len(new_uol_links)} new)")
 
         file_path = os.path.join(year_folder_path, f"{actual_month}-{actual_year}.txt")
         if year != actual_year:
             adjusted_year_folder_path = os.path.join(OUTPUT_FILES_PATH, str(actual_year))
-            os.makedirs(adjusted_year_folder_path, exist_ok=True)
+            ensure_dir(adjusted_year_folder_path)
             file_path = os.path.join(adjusted_year_folder_path, f"{actual_month}-{actual_year}.txt")
 
-        links_found_count += len(uol_links) 
-        with open(file_path, 'a') as f:
-            f.write("\n".join(uol_links) + "\n")
+        links_found_count += len(new_uol_links)
+        if not new_uol_links:
+            continue
+        if file_path not in opened_files:
+            opened_files[file_path] = open(file_path, 'a', buffering=1<<20, encoding="utf-8") # 1 MiB buffer
+        opened_files[file_path].write("\n".join(new_uol_links) + "\n")
+
+    for f in opened_files.values():
+        f.close()
     
     logging.info(f"Loss rate: {loss_count}/{total_archive_links}")
     logging.info(f"Total links found: {links_found_count}")
@@ -144,17 +212,26 @@ def main():
     config_root_logger(args.quiet)
 
     archive_df = pd.read_csv(filepath_or_buffer=ARCHIVE_CSV_PATH)
-    archive_df["links"] = [json.loads(s) for s in archive_df["links"]] # from str to list
+    archive_df["links"] = archive_df["links"].map(orjson.loads) # from str to list
 
-    grouped_archive_df = archive_df.groupby(by="year")
+    rows = [row for _, year_df in archive_df.groupby(by="year") for row in year_df.itertuples(index=False, name="row")]
     start_time = time.time()
-    for year, year_df in grouped_archive_df:
-        logging.info(f"==> Year {year}:")  
+    # A single pool for the whole run. The downloads of the next month are submitted before the current month is parsed
+    # and written, so the workers keep downloading meanwhile instead of idling until the next month starts.
+    # map() submits all the requests at once and yields the responses in the same order as the links
+    with ThreadPoolExecutor(max_workers=MAX_NUM_WORKERS, thread_name_prefix="Worker") as executor:
+        next_responses = executor.map(get_response, rows[0].links) if rows else None
+        for i, row in enumerate(rows):
+            responses = next_responses
+            if i + 1 < len(rows):
+                next_responses = executor.map(get_response, rows[i+1].links)
+
+            if i == 0 or row.year != rows[i-1].year:
+                logging.info(f"==> Year {row.year}:")
 
-        for row in year_df.itertuples(index=False, name="row"):
             logging.info(f"Month {row.month} ({len(row.links)} links to precess):")
             month_start_time = time.time()
-            save_uol_news_links(row.links, int(row.year))
+            save_uol_news_links(row.links, int(row.year), responses)
             month_end_time = time.time()
             logging.info(f"Month {row.month} processing time: {(month_end_time - month_start_time)/60:.02f}min")
             logging.info("")
@@ -174,4 +251,7 @@ Examples of archive page anchor elements in different years:
 
 It's possible to note that the actual UOL news url in href attribute is at the end. That's why "http" + u.split("http")[-1] has
 been used as href filter.
+
+Note: the pages are now requested with the "id_" modifier, so the hrefs are not prefixed with the web archive URL anymore, but the
+click.uol.com.br redirect links (...&u=http://...) still need the filter.
 """
\ No newline at end of file
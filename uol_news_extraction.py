@@ -8,7 +8,7 @@ Note: to avoid extremely long processing times, only one folder is processed per
 Note: multithreading is used to improve performance.
 """
 
-from bs4 import BeautifulSoup
+from lxml import etree
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
@@ -16,18 +16,25 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import TimeoutException
 import logging
-import logging.handlers
 import requests
-from requests.exceptions import ReadTimeout, ConnectionError, RequestException
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
 import os
+from urllib.parse import urlparse
 import argparse
 from argparse import ArgumentError
-from queue import Queue # handles locking internally for multithreading tasks
 import sys
 from concurrent.futures import ThreadPoolExecutor
-from threading import Lock
+from threading import Thread, Lock, BoundedSemaphore, local
+from collections.abc import Iterator
+from queue import Queue # handles locking internally for multithreading tasks
 import time
+import sqlite3
 import re
+import codecs
+from html import unescape
+import atexit
 
 UOL_LINKS_PATH = os.path.join("out", "uol_links")
 
@@ -41,11 +48,13 @@ def parse_args():
     )
 
     def check_year(year:str):
-        if year not in os.listdir(UOL_LINKS_PATH): # Check if the year is a folder inside UOL_LINKS_PATH
-            raise ArgumentError(message=f"{year} is not a folder in {UOL_LINKS_PATH}.")
+        with os.scandir(UOL_LINKS_PATH) as entries:
+            if not any(e.name == year and e.is_dir() for e in entries): # Check if the year is a folder inside UOL_LINKS_PATH
+                raise ArgumentError(message=f"{year} is not a folder in {UOL_LINKS_PATH}.")
         path = os.path.join(UOL_LINKS_PATH, year)
-        if len(os.listdir(path)) == 0: # Check if the year folder is empty
-            raise ArgumentError(message=f"{path} is empty.")
+        with os.scandir(path) as entries:
+            if next(entries, None) is None: # Check if the year folder is empty (without listing all of it)
+                raise ArgumentError(message=f"{path} is empty.")
         return year
     
     parser.add_argument(
@@ -55,6 +64,13 @@ def parse_args():
         required=True
     )
 
+    parser.add_argument(
+        "--max-workers",
+        help="Number of worker threads, i.e. maximum number of requests in flight at the same time. A quarter of them (at least 8) can go to the same host.",
+        type=int,
+        default=min(64, (os.cpu_count() or 4) * 8) # the threads mostly wait for the network, so many more than the CPUs
+    )
+
     return parser.parse_args()
 
 args = parse_args()
@@ -64,78 +80,169 @@ LOG_PATH = os.path.join("logs", f"{os.path.basename(__file__).split(".")[0]}_{ar
 
 OUTPUT_FOLDER_PATH = os.path.join("out", "uol_news", args.year_folder)
 os.makedirs(OUTPUT_FOLDER_PATH, exist_ok=True)
+DONE_DB_PATH = os.path.join("out", "uol_news", "done.db") # links already scraped and written, skipped by the next runs
+DONE_COMMIT_EVERY = 100 # links written by a writer thread before recording them as done
 
 REQUEST_TIMEOUT = 15
-RETRY_TIME = 2
-MAX_WORKERS = 5
-GLOBAL_LOCK = Lock()
-error_count = 0
+RETRY_BACKOFF = 0.5 # exponential backoff factor between retries
+PARSER_CHUNK_SIZE = 16384 # in bytes, the HTML is fed to the parser in chunks of this size
+# A div opening tag, or a comment/script/style skipped as a whole (their content isn't HTML, a div in there isn't a div)
+DIV_OR_SKIPPED_PATTERN = re.compile(rb'''<!--.*?(?:-->|\Z)|<(script|style)(?=[\s/>]).*?(?:</\1\s*>|\Z)|<div(?=[\s/>])((?:[^>"']|"[^"]*"|'[^']*')*)>''', re.DOTALL | re.IGNORECASE)
+ATTRIBUTE_PATTERN = re.compile(rb'''([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?''') # double, single or no quotes
+DIV_END_PATTERN = re.compile(rb'</div\s*>', re.IGNORECASE)
+NESTED_MARKUP_PATTERN = re.compile(rb'<(?:div|!|script|style)', re.IGNORECASE) # markup the fast path can't handle like lxml
+TAG_PATTERN = re.compile(rb'''</?[a-z](?:[^>"']|"[^"]*"|'[^']*')*>''', re.IGNORECASE)
+CHARSET_PATTERN = re.compile(rb'<meta[^>]*charset=["\']?([\w-]+)', re.IGNORECASE)
+HEADER_CHARSET_PATTERN = re.compile(r'charset=["\']?([\w-]+)', re.IGNORECASE)
+MAX_WORKERS = args.max_workers # the workload is network-bound, each worker spends most of its time waiting for a response
+MAX_PENDING_LINKS = MAX_WORKERS * 4 # links submitted to the pool and not done yet, bounds the executor queue
+# Requests in flight to the same UOL host (e.g. esporte.uol.com.br), to be polite with the servers. Most news are on a handful
+# of hosts, so the effective concurrency is min(MAX_WORKERS, MAX_REQUESTS_PER_HOST * hosts): it scales with --max-workers,
+# otherwise most of a bigger pool would just wait for a host slot
+MAX_REQUESTS_PER_HOST = max(8, MAX_WORKERS // 4)
+
+# A single session shared by the workers, so DNS/TCP/TLS handshakes with UOL's hosts are reused across requests
+SESSION = requests.Session()
+SESSION.headers.update({
+    "Connection": "keep-alive",
+    "Accept-Encoding": "gzip, deflate, br", # br responses are decoded by urllib3 through the brotli package
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+})
+retry = Retry(total=3, backoff_factor=RETRY_BACKOFF, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS*2, max_retries=retry)
+SESSION.mount("https://", adapter)
+SESSION.mount("http://", adapter)
+
+def config_root_logger(quiet_mode:bool):
+    # The handlers are called directly by the worker threads (each handler has its own lock), no listener thread is needed
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG) # let handlers check log levels
+
+    formatter = logging.Formatter("[%(levelname)s - %(asctime)s - %(threadName)s] %(message)s")
 
-def logs_listener_config(quiet_mode:bool, queue:Queue) -> logging.handlers.QueueListener:
     file_handler = logging.FileHandler(filename=LOG_PATH, mode="w")
     file_handler.setLevel(logging.INFO)
-    
-    if quiet_mode:
-        return logging.handlers.QueueListener(queue, file_handler, respect_handler_level=True)
-    
-    stdout_handler = logging.StreamHandler(sys.stdout)
-    stdout_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+    root.addHandler(file_handler)
 
-    return logging.handlers.QueueListener(queue, file_handler, stdout_handler, respect_handler_level=True)
+    if not quiet_mode:
+        stdout_handler = logging.StreamHandler(sys.stdout)
+        stdout_handler.setLevel(logging.INFO)
+        stdout_handler.setFormatter(formatter)
+        root.addHandler(stdout_handler)
 
-def root_logger_config(queue:Queue) -> logging.Logger:
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG) # don't filter here — the listener is responsible for deciding which logs to output
+WRITE_QUEUES: dict[str, Queue] = dict() # output file path -> queue consumed by the file writer thread
 
-    formatter = logging.Formatter("[%(levelname)s - %(asctime)s - %(threadName)s] %(message)s")
-    
-    queue_handler = logging.handlers.QueueHandler(queue)
-    queue_handler.setLevel(logging.DEBUG) # don't filter here — the listener is responsible for deciding which logs to output
-    queue_handler.setFormatter(formatter)
+def mark_done(db:sqlite3.Connection, links:list[str]):
+    """
+    Record 'links' as done in the DONE_DB_PATH database.
+    """
+    with db: # commits on exit
+        db.executemany("INSERT OR IGNORE INTO done VALUES (?)", [(link,) for link in links])
 
-    root_logger.addHandler(queue_handler)
+def writer(output_file_path:str, queue:Queue):
+    """
+    Append the texts received from 'queue' to 'output_file_path' until None is received, then record their links as done.
+    Each output file has its own writer thread, so the workers never wait for a lock or an open() to write.
+    """
+    db = sqlite3.connect(DONE_DB_PATH, timeout=30) # a connection per thread, sqlite connections can't be shared
+    written_links = list()
+    with open(file=output_file_path, mode="ab", buffering=1<<20) as f: # binary mode with a 1 MiB buffer: no text layer per write
+        while (item := queue.get()) is not None:
+            link, text = item
+            f.write((text + "\n").encode("utf-8"))
+            written_links.append(link)
+
+            if len(written_links) >= DONE_COMMIT_EVERY:
+                f.flush() # the texts must be in the file before their links are recorded as done
+                mark_done(db, written_links)
+                written_links.clear()
+
+        f.flush()
+        mark_done(db, written_links)
+    db.close()
+
+host_semaphores: dict[str, BoundedSemaphore] = dict() # host -> semaphore limiting its requests in flight
+host_semaphores_lock = Lock()
+
+def get_host_semaphore(link:str) -> BoundedSemaphore:
+    """
+    Return the semaphore of the link's host, creating it on the first request to that host.
+    """
+    host = urlparse(link).netloc
+    with host_semaphores_lock:
+        if host not in host_semaphores:
+            host_semaphores[host] = BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+        return host_semaphores[host]
 
 def get_response(link:str) -> requests.Response | None:
     """
     Return the response or None in failure.
     """
-    for n_try in range(3):
-        try:
-            response = requests.get(link, timeout=REQUEST_TIMEOUT)
-            if response.status_code != 200:
-                logging.error(f"Status code == {response.status_code} for {link}, skipping...")
-                response = None
-            break
-        except ConnectionError:
-            logging.debug(f"ConnectionError for {link} (attempt {n_try+1})")
-            time.sleep(RETRY_TIME)
-        except ReadTimeout:
-            logging.debug(f"ReadTimeout for {link} (attempt {n_try+1})")
-            time.sleep(RETRY_TIME)
-        except RequestException as e:
-            logging.debug(f"RequestException for {link} (attempt {n_try+1}): {e}\n")
-            time.sleep(RETRY_TIME)
-    else:
-        logging.error(f"Failed to connect with {link} after {n_try+1} attempts, skipping...")
-        response = None
+    try:
+        # The host slot is held during the retries too (and their backoff sleeps), so a failing host isn't hammered
+        with get_host_semaphore(link):
+            response = SESSION.get(link, timeout=REQUEST_TIMEOUT) # retries are handled by the session adapter
+    except RequestException as e:
+        logging.error(f"Failed to connect with {link}, skipping... ({e})")
+        return None
+
+    if response.status_code != 200:
+        logging.error(f"Status code == {response.status_code} for {link}, skipping...")
+        return None
 
-    time.sleep(2)
     return response
 
+def get_header_charset(response:requests.Response) -> str | None:
+    """
+    Return the charset declared in the Content-Type header of 'response', or None if it doesn't declare a known one.
+    Note: response.encoding can't be used, requests sets it to ISO-8859-1 for any text/* response without a charset.
+    """
+    match = HEADER_CHARSET_PATTERN.search(response.headers.get("Content-Type", ""))
+    if match is None:
+        return None
+    try:
+        codecs.lookup(match.group(1))
+    except LookupError: # unknown encoding name, the page is decoded as if there was no charset in the header
+        return None
+    return match.group(1)
+
+selenium_thread_data = local() # each worker thread keeps its own Chrome driver
+selenium_drivers: list[webdriver.Chrome] = list() # all drivers created, to quit them at exit
+
+def get_selenium_driver() -> webdriver.Chrome:
+    """
+    Return the Chrome driver of the current worker thread, launching it on the first call.
+    """
+    driver = getattr(selenium_thread_data, "driver", None)
+    if driver is None:
+        options = Options() 
+        options.add_argument("--no-sandbox") # turn off security mode to avoid some issues
+        options.add_argument("--log-level=3") # set to log only error messages
+        options.add_argument("--start-maximized")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--disable-dev-shm-usage") # /dev/shm is often too small, use /tmp instead
+        # options.add_argument("--headless=new")
+        options.page_load_strategy = "eager"
+
+        driver = webdriver.Chrome(options=options)
+        selenium_thread_data.driver = driver
+        selenium_drivers.append(driver)
+    return driver
+
+@atexit.register
+def quit_selenium_drivers():
+    for driver in selenium_drivers:
+        driver.quit()
+
 def worker_selenium(link:str) -> str:
     """
-    Built as a fallback for the requests + beautifulsoup workflow. 
+    Built as a fallback for the requests + lxml workflow. 
     For more details, see the comment in the worker() function.
+    The Chrome instance is reused by the following calls in the same thread (it's only closed at exit).
     """
     
-    options = Options() 
-    options.add_argument("--no-sandbox") # turn off security mode to avoid some issues
-    options.add_argument("--log-level=3") # set to log only error messages
-    options.add_argument("--start-maximized")
-    # options.add_argument("--headless=new")
-    options.page_load_strategy = "eager"
-
-    driver = webdriver.Chrome(options=options)
+    driver = get_selenium_driver()
     wait = WebDriverWait(driver, 10)
 
     driver.get(link)
@@ -145,80 +252,229 @@ def worker_selenium(link:str) -> str:
         text = clean_text(element.text)
     except TimeoutException:
         logging.error(f"Timeout by selenium for {link}")
-    driver.quit()
+    return text
+
+def extract_text_fast(content:bytes, header_charset:str | None) -> str | None:
+    """
+    Same as extract_text(), but scanning the bytes with regexes, without building any tree. Returns None whenever the result
+    could differ from extract_text()'s (no news div, nested divs, comments or scripts in it, no declared charset...), in
+    which case extract_text() must be used.
+    """
+    text_div = None # same priority as extract_text(): the first class="text" div, else the first id="texto" div
+    texto_div = None
+    for match in DIV_OR_SKIPPED_PATTERN.finditer(content):
+        if match.group(2) is None: # comment, script or style
+            continue
+
+        attributes = dict()
+        for name, *values in ATTRIBUTE_PATTERN.findall(match.group(2)):
+            name = name.lower()
+            if name in attributes: # duplicated attribute, which one lxml keeps is not worth guessing
+                return None
+            attributes[name] = b"".join(values) # at most one of the quoting alternatives is not empty
+
+        if b"text" in attributes.get(b"class", b"").split():
+            text_div = match
+            break
+        if texto_div is None and attributes.get(b"id") == b"texto":
+            texto_div = match
+
+    news_div = text_div or texto_div
+    if news_div is None:
+        return None
+
+    # The div can only be closed by the first </div> if there is no div (nor anything hiding one) inside it
+    div_end = DIV_END_PATTERN.search(content, news_div.end())
+    if div_end is None:
+        return None
+    body = content[news_div.end():div_end.start()]
+    if NESTED_MARKUP_PATTERN.search(body):
+        return None
+    body = TAG_PATTERN.sub(b"", body)
+    if b"<" in body: # a "<" that isn't a tag, lxml may read it differently
+        return None
+
+    # The charset of the HTTP header comes first, as it's forced on lxml in extract_text(), then the one declared in the page.
+    # Without any, lxml guesses the encoding, so the fast path can't tell how it would decode the page.
+    charset = CHARSET_PATTERN.search(content)
+    if header_charset is None and charset is None:
+        return None
+    encoding = header_charset or charset.group(1).decode("ascii")
+    try:
+        text = body.decode(encoding, errors="replace")
+    except LookupError: # unknown encoding name
+        return None
+    return unescape(text) # e.g. &eacute; -> é
+
+def extract_text(content:bytes, header_charset:str | None) -> str | None:
+    """
+    Return the text of the first div with class="text" in the HTML 'content', or of the first div with id="texto" if there
+    isn't one, or None if there is neither. The parsing stops as soon as the class="text" div is closed, so the rest of the
+    page (comments, footer...) isn't parsed.
+    """
+    # Without a charset in the HTTP header, lxml detects the page encoding itself (e.g. from its meta tag)
+    parser = etree.HTMLPullParser(events=("start", "end"), tag="div", encoding=header_charset)
+    text_div = None # first div with class="text", in document order
+    texto_div = None # first div with id="texto", only used if there is no class="text" div
+
+    def find_news_div() -> str | None:
+        nonlocal text_div, texto_div
+        for event, element in parser.read_events():
+            if event == "start":
+                if text_div is None and "text" in (element.get("class") or "").split():
+                    text_div = element
+                if texto_div is None and element.get("id") == "texto":
+                    texto_div = element
+            elif element is text_div:
+                return "".join(element.itertext())
+        return None
+
+    for start in range(0, len(content), PARSER_CHUNK_SIZE):
+        parser.feed(content[start:start+PARSER_CHUNK_SIZE])
+        text = find_news_div()
+        if text is not None:
+            return text
+
+    try:
+        parser.close() # flush the elements still open at the end of the document
+    except etree.XMLSyntaxError: # e.g. empty body, there is no document at all
+        return None
+    text = find_news_div()
+    if text is None and texto_div is not None:
+        text = "".join(texto_div.itertext())
     return text
 
 def clean_text(text:str) -> str:
     """
     Implement simple text cleaning.
     """
-    return re.sub(r'\s+', ' ', text).strip().lower()
+    return " ".join(text.split()).lower() # split() without arguments splits on (and drops) any run of whitespace
 
-def worker(link:str, output_file_path:str):
+def worker(link:str, output_file_path:str) -> bool:
     """
     Scrape news text from 'link' and append to 'output_file_path'. Returns True on success, False on failure.
     """
-    
-    # Technical note: global variables can be READ without 'global' keyword, but MODIFICATION requires 'global' declaration,
-    # when Python sees an assignment (=) to a variable inside a function, it automatically treats that variable as local.
-    global error_count
 
     cleaned_text = None
     response = get_response(link)
     if response:
-        soup = BeautifulSoup(response.text, 'html.parser')
-        divs = soup.find_all(name="div", class_="text")
-        if len(divs) == 0:
-            divs = soup.find_all(name="div", id="texto")
-        
-        cleaned_text = clean_text(divs[0].text)
+        header_charset = get_header_charset(response) # both extractors must decode the page the same way
+        text = extract_text_fast(response.content, header_charset)
+        if text is None:
+            text = extract_text(response.content, header_charset)
+        if text is not None:
+            cleaned_text = clean_text(text)
+        else:
+            logging.error(f"News text not found in {link}, skipping...")
     else:
         # After several tests, I noticed that running Selenium without the --headless option improved the success rate:
-        # some links that failed to load with requests + beautifulsoup were successfully accessed via Selenium (non-headless mode).
+        # some links that failed to load with requests were successfully accessed via Selenium (non-headless mode).
         # However, running Selenium in headless mode was quite inconsistent and didn’t provide significant improvements.
-        # If having hundreds of Chrome windows open is not an issue, uncomment the lines below to use Selenium as a fallback
-        # when requests + beautifulsoup fail.
+        # If having one Chrome window open per worker thread is not an issue, uncomment the lines below to use Selenium as a fallback
+        # when requests fail.
         # -----
         # logging.info("Trying selenium...")
         # cleaned_text = worker_selenium(link)
         pass
 
-    if cleaned_text:
-        with GLOBAL_LOCK:
-            with open(file=output_file_path, mode="a") as f:
-                f.write(cleaned_text + "\n")
-    else:
-        with GLOBAL_LOCK:
-            error_count += 1
-    
-    time.sleep(2)
+    if not cleaned_text:
+        return False
 
-def main():
-    logs_queue = Queue()
-    logs_listener = logs_listener_config(quiet_mode=args.quiet, queue=logs_queue)
-    logs_listener.start()
+    WRITE_QUEUES[output_file_path].put((link, cleaned_text))
+    return True
 
-    root_logger_config(logs_queue)
+def read_links(file_path:str) -> Iterator[str]:
+    """
+    Yield the links in 'file_path' one at a time, skipping blank lines.
+    """
+    with open(file=file_path, mode="r") as f:
+        for line in f:
+            link = line.strip()
+            if link:
+                yield link
+
+def iter_work(files:list[os.DirEntry]) -> Iterator[tuple[str,str]]:
+    """
+    Yield (link, output file path) pairs for all links of all files, one file after the other, as a single stream.
+    """
+    for file in files:
+        file_path = file.path
+        output_file_path = os.path.join(OUTPUT_FOLDER_PATH, file.name)
+
+        num_links = 0
+        for link in read_links(file_path):
+            yield link, output_file_path
+            num_links += 1
+        logging.info(f"{num_links} links from '{file_path}'.")
+
+def main():
+    config_root_logger(args.quiet)
 
     year_folder_path = os.path.join(UOL_LINKS_PATH, args.year_folder)
-    files = os.listdir(year_folder_path)
+    with os.scandir(year_folder_path) as entries:
+        files = [e for e in entries if e.is_file()] # the entries already carry their path and type, no extra stat calls
 
     logging.info(f"{len(files)} file(s) to process.")
     total_links = 0
     start_time = time.time()
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="Worker") as executor:
-        for file in files:
-            file_path = os.path.join(year_folder_path, file)
-            with open(file=file_path, mode="r") as f:
-                links = [line.strip() for line in f.readlines()]
-        
-            num_links = len(links)
-            total_links += num_links
-            logging.info(f"{num_links} links from '{file_path}'.")
-
-            for link in links:
-                executor.submit(worker, link, os.path.join(OUTPUT_FOLDER_PATH, file))
 
+    db = sqlite3.connect(DONE_DB_PATH)
+    db.execute("CREATE TABLE IF NOT EXISTS done(url TEXT PRIMARY KEY)")
+    done_links = {url for (url,) in db.execute("SELECT url FROM done")}
+    db.close()
+    logging.info(f"{len(done_links)} link(s) already done in previous runs.")
+
+    writers = list()
+    for file in files:
+        output_file_path = os.path.join(OUTPUT_FOLDER_PATH, file.name)
+        WRITE_QUEUES[output_file_path] = Queue()
+        writers.append(Thread(target=writer, args=(output_file_path, WRITE_QUEUES[output_file_path]), name=f"Writer-{file.name}"))
+        writers[-1].start()
+
+    error_count = 0
+    error_count_lock = Lock() # only guards the counter, never held during I/O
+    pending_links = BoundedSemaphore(MAX_PENDING_LINKS)
+    seen_links = set()
+    duplicate_count = 0
+    already_done_count = 0
+
+    def on_worker_done(future):
+        nonlocal error_count
+        if future.exception() is not None:
+            logging.error(f"Unexpected error in worker: {future.exception()}")
+        if future.exception() is not None or not future.result():
+            with error_count_lock:
+                error_count += 1
+        pending_links.release()
+
+    try:
+        # A single stream of work for all files: the workers move on to the next file without waiting for the current one
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="Worker") as executor:
+            for link, output_file_path in iter_work(files):
+                # The same news can be linked in several files (e.g. in the end of a month and in the beginning of the next one)
+                if link in seen_links:
+                    duplicate_count += 1
+                    continue
+                seen_links.add(link)
+
+                if link in done_links:
+                    already_done_count += 1
+                    continue
+
+                pending_links.acquire() # wait while the pool already has MAX_PENDING_LINKS links to process
+                future = executor.submit(worker, link, output_file_path)
+                future.add_done_callback(on_worker_done)
+                total_links += 1
+    finally:
+        # All workers are done (or the run was interrupted, e.g. Ctrl-C): stop the writers once their queues are drained,
+        # so the texts already scraped are flushed and recorded as done, and the interpreter doesn't hang on them at exit
+        for queue in WRITE_QUEUES.values():
+            queue.put(None)
+        for writer_thread in writers:
+            writer_thread.join()
+
+    logging.info(f"{duplicate_count} duplicated links skipped.")
+    logging.info(f"{already_done_count} links skipped, already done in previous runs.")
     if total_links > 0:
         success_rate = (total_links - error_count) / total_links * 100
     else:
@@ -227,7 +483,6 @@ def main():
     logging.info(f"Processed {total_links} links - {total_links - error_count}/{total_links} succeeded ({success_rate:.1f}%).")
     end_time = time.time()
     logging.info(f"Total time taken to complete: {int((end_time - start_time)/60)}min")
-    logs_listener.stop()
     
 if __name__ == "__main__":
     main()
\ No newline at end of file